@@ -1,16 +1,17 @@
 """The FileFlows integration."""
 from __future__ import annotations
 
+from functools import partial
 import logging
-from typing import Any
 
 import voluptuous as vol
 
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import CONF_HOST, Platform
-from homeassistant.core import HomeAssistant, ServiceCall
+from homeassistant.core import HomeAssistant, ServiceCall, callback
 from homeassistant.exceptions import ConfigEntryNotReady
 from homeassistant.helpers import config_validation as cv
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
 
 from .api import FileFlowsApi, FileFlowsApiError
 from .const import (
@@ -18,6 +19,7 @@ from .const import (
     ATTR_FLOW_UID,
     ATTR_LIBRARY_UID,
     ATTR_NODE_UID,
+    ATTR_SKIP_REFRESH,
     ATTR_TASK_UID,
     ATTR_WORKER_UID,
     CONF_PASSWORD,
@@ -57,20 +59,68 @@ PLATFORMS: list[Platform] = [
     Platform.BUTTON,
 ]
 
+# Service schemas are compiled once at import instead of on every setup
+_BASE_SCHEMA = vol.Schema({vol.Optional(ATTR_SKIP_REFRESH, default=False): cv.boolean})
+_NODE_SCHEMA = _BASE_SCHEMA.extend({vol.Required(ATTR_NODE_UID): cv.string})
+_LIBRARY_SCHEMA = _BASE_SCHEMA.extend({vol.Required(ATTR_LIBRARY_UID): cv.string})
+_FLOW_SCHEMA = _BASE_SCHEMA.extend({vol.Required(ATTR_FLOW_UID): cv.string})
+_FILE_SCHEMA = _BASE_SCHEMA.extend({vol.Required(ATTR_FILE_UID): cv.string})
+_FILE_LIST_SCHEMA = _BASE_SCHEMA.extend(
+    {vol.Required(ATTR_FILE_UID): vol.All(cv.ensure_list, [cv.string])}
+)
+_WORKER_SCHEMA = _BASE_SCHEMA.extend({vol.Required(ATTR_WORKER_UID): cv.string})
+# Services that don't refresh afterwards take no skip_refresh
+_NO_REFRESH_SCHEMA = vol.Schema({})
+_TASK_SCHEMA = vol.Schema({vol.Required(ATTR_TASK_UID): cv.string})
+
+# (service, schema, API method, call.data key passed to it, refresh afterwards)
+_SERVICES: tuple[tuple[str, vol.Schema, str, str | None, bool], ...] = (
+    # System
+    (SERVICE_PAUSE_SYSTEM, _BASE_SCHEMA, "pause_system", None, True),
+    (SERVICE_RESUME_SYSTEM, _BASE_SCHEMA, "resume_system", None, True),
+    (SERVICE_RESTART_SYSTEM, _NO_REFRESH_SCHEMA, "restart_system", None, False),
+    # Nodes
+    (SERVICE_ENABLE_NODE, _NODE_SCHEMA, "enable_node", ATTR_NODE_UID, True),
+    (SERVICE_DISABLE_NODE, _NODE_SCHEMA, "disable_node", ATTR_NODE_UID, True),
+    # Libraries
+    (SERVICE_ENABLE_LIBRARY, _LIBRARY_SCHEMA, "enable_library", ATTR_LIBRARY_UID, True),
+    (SERVICE_DISABLE_LIBRARY, _LIBRARY_SCHEMA, "disable_library", ATTR_LIBRARY_UID, True),
+    (SERVICE_RESCAN_LIBRARY, _LIBRARY_SCHEMA, "rescan_library", ATTR_LIBRARY_UID, True),
+    (SERVICE_RESCAN_ALL_LIBRARIES, _BASE_SCHEMA, "rescan_all_libraries", None, True),
+    # Flows
+    (SERVICE_ENABLE_FLOW, _FLOW_SCHEMA, "enable_flow", ATTR_FLOW_UID, True),
+    (SERVICE_DISABLE_FLOW, _FLOW_SCHEMA, "disable_flow", ATTR_FLOW_UID, True),
+    # Files
+    (SERVICE_REPROCESS_FILE, _FILE_SCHEMA, "reprocess_file", ATTR_FILE_UID, True),
+    (SERVICE_FORCE_PROCESSING, _FILE_LIST_SCHEMA, "force_processing", ATTR_FILE_UID, True),
+    (SERVICE_UNHOLD_FILES, _FILE_LIST_SCHEMA, "unhold_files", ATTR_FILE_UID, True),
+    # Workers
+    (SERVICE_ABORT_WORKER, _WORKER_SCHEMA, "abort_worker", ATTR_WORKER_UID, True),
+    # Tasks
+    (SERVICE_RUN_TASK, _TASK_SCHEMA, "run_task", ATTR_TASK_UID, False),
+)
+_ALL_SERVICES: tuple[str, ...] = tuple(spec[0] for spec in _SERVICES)
+
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Set up FileFlows from a config entry."""
+    data = entry.data
+
     # Clean username/password - convert empty strings to None
-    username = entry.data.get(CONF_USERNAME, "").strip() if entry.data.get(CONF_USERNAME) else None
-    password = entry.data.get(CONF_PASSWORD, "").strip() if entry.data.get(CONF_PASSWORD) else None
+    username = (data.get(CONF_USERNAME) or "").strip() or None
+    password = (data.get(CONF_PASSWORD) or "").strip() or None
+
+    verify_ssl = data.get(CONF_VERIFY_SSL, DEFAULT_VERIFY_SSL)
 
+    # Share Home Assistant's pooled session so connections survive reloads
     api = FileFlowsApi(
-        host=entry.data[CONF_HOST],
-        port=entry.data.get(CONF_PORT, DEFAULT_PORT),
-        ssl=entry.data.get(CONF_SSL, DEFAULT_SSL),
-        verify_ssl=entry.data.get(CONF_VERIFY_SSL, DEFAULT_VERIFY_SSL),
+        host=data[CONF_HOST],
+        port=data.get(CONF_PORT, DEFAULT_PORT),
+        ssl=data.get(CONF_SSL, DEFAULT_SSL),
+        verify_ssl=verify_ssl,
         username=username,
         password=password,
+        session=async_get_clientsession(hass, verify_ssl=verify_ssl),
     )
 
     try:
@@ -87,8 +137,9 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
 
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
 
-    # Register services
-    await _async_register_services(hass)
+    # Services are shared by all entries - only the first one registers them
+    if not hass.services.has_service(DOMAIN, SERVICE_PAUSE_SYSTEM):
+        _async_register_services(hass, coordinator)
 
     return True
 
@@ -99,288 +150,49 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
         coordinator: FileFlowsDataUpdateCoordinator = hass.data[DOMAIN].pop(entry.entry_id)
         await coordinator.api.close()
 
-    # Remove services if no more entries
-    if not hass.data[DOMAIN]:
-        for service in [
-            SERVICE_PAUSE_SYSTEM,
-            SERVICE_RESUME_SYSTEM,
-            SERVICE_RESTART_SYSTEM,
-            SERVICE_ENABLE_NODE,
-            SERVICE_DISABLE_NODE,
-            SERVICE_ENABLE_LIBRARY,
-            SERVICE_DISABLE_LIBRARY,
-            SERVICE_RESCAN_LIBRARY,
-            SERVICE_RESCAN_ALL_LIBRARIES,
-            SERVICE_ENABLE_FLOW,
-            SERVICE_DISABLE_FLOW,
-            SERVICE_REPROCESS_FILE,
-            SERVICE_ABORT_WORKER,
-            SERVICE_RUN_TASK,
-            SERVICE_FORCE_PROCESSING,
-            SERVICE_UNHOLD_FILES,
-        ]:
-            hass.services.async_remove(DOMAIN, service)
+        # Services are bound to one coordinator - drop them and rebind to a
+        # remaining entry, if any
+        _async_remove_services(hass)
+        if hass.data[DOMAIN]:
+            _async_register_services(hass, next(iter(hass.data[DOMAIN].values())))
 
     return unload_ok
 
 
-def _get_coordinator(hass: HomeAssistant) -> FileFlowsDataUpdateCoordinator:
-    """Get the first coordinator."""
-    for coordinator in hass.data[DOMAIN].values():
-        return coordinator
-    raise ValueError("No FileFlows coordinator found")
-
-
-async def _async_register_services(hass: HomeAssistant) -> None:
-    """Register FileFlows services."""
-
-    # Skip if already registered
-    if hass.services.has_service(DOMAIN, SERVICE_PAUSE_SYSTEM):
-        return
-
-    # =========================================================================
-    # System Services
-    # =========================================================================
-    async def async_pause_system(call: ServiceCall) -> None:
-        """Pause the system."""
-        coordinator = _get_coordinator(hass)
-        await coordinator.api.pause_system()
-        await coordinator.async_request_refresh()
-
-    async def async_resume_system(call: ServiceCall) -> None:
-        """Resume the system."""
-        coordinator = _get_coordinator(hass)
-        await coordinator.api.resume_system()
-        await coordinator.async_request_refresh()
-
-    async def async_restart_system(call: ServiceCall) -> None:
-        """Restart the system."""
-        coordinator = _get_coordinator(hass)
-        await coordinator.api.restart_system()
-
-    # =========================================================================
-    # Node Services
-    # =========================================================================
-    async def async_enable_node(call: ServiceCall) -> None:
-        """Enable a node."""
-        coordinator = _get_coordinator(hass)
-        node_uid = call.data[ATTR_NODE_UID]
-        await coordinator.api.enable_node(node_uid)
-        await coordinator.async_request_refresh()
-
-    async def async_disable_node(call: ServiceCall) -> None:
-        """Disable a node."""
-        coordinator = _get_coordinator(hass)
-        node_uid = call.data[ATTR_NODE_UID]
-        await coordinator.api.disable_node(node_uid)
-        await coordinator.async_request_refresh()
-
-    # =========================================================================
-    # Library Services
-    # =========================================================================
-    async def async_enable_library(call: ServiceCall) -> None:
-        """Enable a library."""
-        coordinator = _get_coordinator(hass)
-        lib_uid = call.data[ATTR_LIBRARY_UID]
-        await coordinator.api.enable_library(lib_uid)
+@callback
+def _async_remove_services(hass: HomeAssistant) -> None:
+    """Remove all FileFlows services."""
+    for service in _ALL_SERVICES:
+        hass.services.async_remove(DOMAIN, service)
+
+
+async def _async_handle_service(
+    coordinator: FileFlowsDataUpdateCoordinator,
+    method: str,
+    key: str | None,
+    refresh: bool,
+    call: ServiceCall,
+) -> None:
+    """Call the API method backing a service, then refresh if requested.
+
+    Callers can pass skip_refresh to batch several calls and let the next
+    poll (or a final call) pick up the changes.
+    """
+    args = () if key is None else (call.data[key],)
+    await getattr(coordinator.api, method)(*args)
+    if refresh and not call.data[ATTR_SKIP_REFRESH]:
         await coordinator.async_request_refresh()
 
-    async def async_disable_library(call: ServiceCall) -> None:
-        """Disable a library."""
-        coordinator = _get_coordinator(hass)
-        lib_uid = call.data[ATTR_LIBRARY_UID]
-        await coordinator.api.disable_library(lib_uid)
-        await coordinator.async_request_refresh()
 
-    async def async_rescan_library(call: ServiceCall) -> None:
-        """Rescan a library."""
-        coordinator = _get_coordinator(hass)
-        lib_uid = call.data[ATTR_LIBRARY_UID]
-        await coordinator.api.rescan_libraries([lib_uid])
-        await coordinator.async_request_refresh()
-
-    async def async_rescan_all_libraries(call: ServiceCall) -> None:
-        """Rescan all enabled libraries."""
-        coordinator = _get_coordinator(hass)
-        await coordinator.api.rescan_all_libraries()
-        await coordinator.async_request_refresh()
-
-    # =========================================================================
-    # Flow Services
-    # =========================================================================
-    async def async_enable_flow(call: ServiceCall) -> None:
-        """Enable a flow."""
-        coordinator = _get_coordinator(hass)
-        flow_uid = call.data[ATTR_FLOW_UID]
-        await coordinator.api.enable_flow(flow_uid)
-        await coordinator.async_request_refresh()
-
-    async def async_disable_flow(call: ServiceCall) -> None:
-        """Disable a flow."""
-        coordinator = _get_coordinator(hass)
-        flow_uid = call.data[ATTR_FLOW_UID]
-        await coordinator.api.disable_flow(flow_uid)
-        await coordinator.async_request_refresh()
-
-    # =========================================================================
-    # File Services
-    # =========================================================================
-    async def async_reprocess_file(call: ServiceCall) -> None:
-        """Reprocess a file."""
-        coordinator = _get_coordinator(hass)
-        file_uid = call.data[ATTR_FILE_UID]
-        await coordinator.api.reprocess_file(file_uid)
-        await coordinator.async_request_refresh()
-
-    async def async_force_processing(call: ServiceCall) -> None:
-        """Force processing of files."""
-        coordinator = _get_coordinator(hass)
-        file_uids = call.data.get(ATTR_FILE_UID, [])
-        if isinstance(file_uids, str):
-            file_uids = [file_uids]
-        # This uses the force-processing endpoint
-        await coordinator.api._post("/api/library-file/force-processing", file_uids)
-        await coordinator.async_request_refresh()
-
-    async def async_unhold_files(call: ServiceCall) -> None:
-        """Unhold files."""
-        coordinator = _get_coordinator(hass)
-        file_uids = call.data.get(ATTR_FILE_UID, [])
-        if isinstance(file_uids, str):
-            file_uids = [file_uids]
-        await coordinator.api.unhold_files(file_uids)
-        await coordinator.async_request_refresh()
-
-    # =========================================================================
-    # Worker Services
-    # =========================================================================
-    async def async_abort_worker(call: ServiceCall) -> None:
-        """Abort a worker."""
-        coordinator = _get_coordinator(hass)
-        worker_uid = call.data[ATTR_WORKER_UID]
-        await coordinator.api.abort_worker(worker_uid)
-        await coordinator.async_request_refresh()
-
-    # =========================================================================
-    # Task Services
-    # =========================================================================
-    async def async_run_task(call: ServiceCall) -> None:
-        """Run a scheduled task."""
-        coordinator = _get_coordinator(hass)
-        task_uid = call.data[ATTR_TASK_UID]
-        await coordinator.api.run_task(task_uid)
-
-    # =========================================================================
-    # Register all services
-    # =========================================================================
-    hass.services.async_register(
-        DOMAIN,
-        SERVICE_PAUSE_SYSTEM,
-        async_pause_system,
-        schema=vol.Schema({}),
-    )
-
-    hass.services.async_register(
-        DOMAIN,
-        SERVICE_RESUME_SYSTEM,
-        async_resume_system,
-        schema=vol.Schema({}),
-    )
-
-    hass.services.async_register(
-        DOMAIN,
-        SERVICE_RESTART_SYSTEM,
-        async_restart_system,
-        schema=vol.Schema({}),
-    )
-
-    hass.services.async_register(
-        DOMAIN,
-        SERVICE_ENABLE_NODE,
-        async_enable_node,
-        schema=vol.Schema({vol.Required(ATTR_NODE_UID): cv.string}),
-    )
-
-    hass.services.async_register(
-        DOMAIN,
-        SERVICE_DISABLE_NODE,
-        async_disable_node,
-        schema=vol.Schema({vol.Required(ATTR_NODE_UID): cv.string}),
-    )
-
-    hass.services.async_register(
-        DOMAIN,
-        SERVICE_ENABLE_LIBRARY,
-        async_enable_library,
-        schema=vol.Schema({vol.Required(ATTR_LIBRARY_UID): cv.string}),
-    )
-
-    hass.services.async_register(
-        DOMAIN,
-        SERVICE_DISABLE_LIBRARY,
-        async_disable_library,
-        schema=vol.Schema({vol.Required(ATTR_LIBRARY_UID): cv.string}),
-    )
-
-    hass.services.async_register(
-        DOMAIN,
-        SERVICE_RESCAN_LIBRARY,
-        async_rescan_library,
-        schema=vol.Schema({vol.Required(ATTR_LIBRARY_UID): cv.string}),
-    )
-
-    hass.services.async_register(
-        DOMAIN,
-        SERVICE_RESCAN_ALL_LIBRARIES,
-        async_rescan_all_libraries,
-        schema=vol.Schema({}),
-    )
-
-    hass.services.async_register(
-        DOMAIN,
-        SERVICE_ENABLE_FLOW,
-        async_enable_flow,
-        schema=vol.Schema({vol.Required(ATTR_FLOW_UID): cv.string}),
-    )
-
-    hass.services.async_register(
-        DOMAIN,
-        SERVICE_DISABLE_FLOW,
-        async_disable_flow,
-        schema=vol.Schema({vol.Required(ATTR_FLOW_UID): cv.string}),
-    )
-
-    hass.services.async_register(
-        DOMAIN,
-        SERVICE_REPROCESS_FILE,
-        async_reprocess_file,
-        schema=vol.Schema({vol.Required(ATTR_FILE_UID): cv.string}),
-    )
-
-    hass.services.async_register(
-        DOMAIN,
-        SERVICE_FORCE_PROCESSING,
-        async_force_processing,
-        schema=vol.Schema({vol.Required(ATTR_FILE_UID): vol.Any(cv.string, [cv.string])}),
-    )
-
-    hass.services.async_register(
-        DOMAIN,
-        SERVICE_UNHOLD_FILES,
-        async_unhold_files,
-        schema=vol.Schema({vol.Required(ATTR_FILE_UID): vol.Any(cv.string, [cv.string])}),
-    )
-
-    hass.services.async_register(
-        DOMAIN,
-        SERVICE_ABORT_WORKER,
-        async_abort_worker,
-        schema=vol.Schema({vol.Required(ATTR_WORKER_UID): cv.string}),
-    )
-
-    hass.services.async_register(
-        DOMAIN,
-        SERVICE_RUN_TASK,
-        async_run_task,
-        schema=vol.Schema({vol.Required(ATTR_TASK_UID): cv.string}),
-    )
+@callback
+def _async_register_services(
+    hass: HomeAssistant, coordinator: FileFlowsDataUpdateCoordinator
+) -> None:
+    """Register FileFlows services bound to the given coordinator."""
+    for service, schema, method, key, refresh in _SERVICES:
+        hass.services.async_register(
+            DOMAIN,
+            service,
+            partial(_async_handle_service, coordinator, method, key, refresh),
+            schema=schema,
+        )
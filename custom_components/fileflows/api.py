@@ -2,17 +2,46 @@
 from __future__ import annotations
 
 import asyncio
-from datetime import datetime, timedelta
+import base64
+from collections.abc import Awaitable
+from functools import partial, partialmethod
 import logging
+import random
+import time
 from typing import Any
 
 import aiohttp
 from aiohttp import ClientError, ClientResponseError, ClientTimeout
+from yarl import URL
+
+try:
+    import orjson
+except ImportError:  # orjson ships with Home Assistant; stdlib for standalone use
+    import json
+
+    def _json_dumps(obj: Any) -> bytes:
+        return json.dumps(obj).encode()
+
+    _json_loads = json.loads
+else:
+    _json_dumps = orjson.dumps
+    _json_loads = orjson.loads
 
 _LOGGER = logging.getLogger(__name__)
 
 DEFAULT_TIMEOUT = ClientTimeout(total=30)
-TOKEN_CACHE_DURATION = timedelta(hours=23)  # Token typically valid for 24h, refresh before expiry
+TOKEN_CACHE_DURATION = 23 * 3600  # Seconds; token typically valid for 24h, refresh before expiry
+TOKEN_EXPIRY_MARGIN = 300  # Seconds before a JWT's exp claim to refresh it
+FILE_BATCH_DELAY = 0.25  # Seconds to collect file UIDs before posting a batch
+NOT_FOUND_CACHE_DURATION = 600  # Seconds to skip GET endpoints that returned 404
+MIN_REFRESH_INTERVAL = 5  # Seconds to reuse the last get_all_data result
+LAST_GOOD_MAX_AGE = 300  # Seconds to keep serving an endpoint's last good data
+REQUEST_ATTEMPTS = 3  # Tries per request when the server is busy or restarting
+RETRY_STATUSES = frozenset({502, 503, 504})  # Retried for GET requests
+MAX_RETRY_DELAY = 10  # Upper bound in seconds for honouring Retry-After
+_JSON_START = b'"[{-0123456789tfn'  # First bytes a JSON document can start with
+
+AUTHORIZE = "/authorize"
 
 # =============================================================================
 # Public Endpoints (no auth required) - used by Fenrus
@@ -32,8 +61,9 @@ API_SYSTEM_PAUSE = "/api/system/pause"
 API_SYSTEM_RESTART = "/api/system/restart"
 API_SETTINGS_FILEFLOWS_STATUS = "/api/settings/fileflows-status"
 API_NODES = "/api/node"
+API_NODE_STATE = "/api/node/state/{uid}"
 API_LIBRARIES = "/api/library"
-API_LIBRARY_STATE = "/api/library/state"
+API_LIBRARY_STATE = "/api/library/state/{uid}"
 API_LIBRARY_RESCAN = "/api/library/rescan"
 API_LIBRARY_RESCAN_ENABLED = "/api/library/rescan-enabled"
 API_LIBRARY_FILE_STATUS = "/api/library-file/status"
@@ -41,13 +71,46 @@ API_LIBRARY_FILE_UPCOMING = "/api/library-file/upcoming"
 API_LIBRARY_FILE_RECENTLY_FINISHED = "/api/library-file/recently-finished"
 API_LIBRARY_FILE_REPROCESS = "/api/library-file/reprocess"
 API_LIBRARY_FILE_UNHOLD = "/api/library-file/unhold"
+API_LIBRARY_FILE_FORCE_PROCESSING = "/api/library-file/force-processing"
 API_FLOWS = "/api/flow"
+API_FLOW_STATE = "/api/flow/state/{uid}"
 API_WORKERS = "/api/worker"
+API_WORKER = "/api/worker/{uid}"
+API_WORKER_BY_FILE = "/api/worker/by-file/{uid}"
 API_TASKS = "/api/task"
+API_TASK_RUN = "/api/task/run/{uid}"
 API_PLUGINS = "/api/plugin"
 API_NVIDIA_SMI = "/api/nvidia/smi"
 API_STATISTICS_STORAGE_SAVED = "/api/statistics/storage-saved"
 
+# Query parameters for the *_STATE endpoints, indexed by the enabled flag
+ENABLE_PARAMS = ({"enable": "false"}, {"enable": "true"})
+
+# Seconds to cache GET responses of endpoints that rarely change
+CACHE_TTL: dict[str, float] = {
+    API_SYSTEM_VERSION: 3600,
+    REMOTE_VERSION: 3600,
+    REMOTE_UPDATE_AVAILABLE: 300,
+    API_PLUGINS: 300,
+    API_FLOWS: 300,
+    API_TASKS: 300,
+    API_LIBRARIES: 60,
+    API_NODES: 60,
+}
+
+
+def _token_lifetime(token: str) -> float:
+    """Seconds to cache a token, from its JWT exp claim when it has one."""
+    try:
+        payload = token.split(".")[1]
+        claims = _json_loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+        remaining = float(claims["exp"]) - time.time()
+    except (IndexError, KeyError, TypeError, ValueError):
+        return TOKEN_CACHE_DURATION
+    # Never longer than the default, and not so short that a skewed server
+    # clock makes every request log in again
+    return min(max(remaining - TOKEN_EXPIRY_MARGIN, 60), TOKEN_CACHE_DURATION)
+
 
 class FileFlowsApiError(Exception):
     """Exception for FileFlows API errors."""
@@ -64,6 +127,38 @@ class FileFlowsAuthError(FileFlowsApiError):
 class FileFlowsApi:
     """FileFlows API Client with Bearer Token Authentication."""
 
+    __slots__ = (
+        "_host",
+        "_port",
+        "_ssl",
+        "_verify_ssl",
+        "_username",
+        "_password",
+        "_session",
+        "_close_session",
+        "_bearer_token",
+        "_token_expires_at",
+        "_auth_headers",
+        "_token_lock",
+        "_login_error",
+        "_auth_required",
+        "_cache",
+        "_cache_generation",
+        "_not_found",
+        "_etags",
+        "_urls",
+        "_inflight",
+        "_last_good",
+        "_all_data_task",
+        "_all_data_at",
+        "_writes",
+        "_all_data_writes",
+        "_file_batches",
+        "_base_url",
+    )
+
+    _BASE_HEADERS = {"Accept": "application/json"}
+
     def __init__(
         self,
         host: str,
@@ -96,7 +191,41 @@ class FileFlowsApi:
 
         # Bearer token management
         self._bearer_token: str | None = None
-        self._token_expires_at: datetime | None = None
+        # time.monotonic() deadline, immune to wall clock changes
+        self._token_expires_at = 0.0
+        self._auth_headers: dict[str, str] | None = None
+        self._token_lock = asyncio.Lock()
+        # Error of the last failed login, shared with callers waiting on it
+        self._login_error: FileFlowsApiError | None = None
+        # Set once the server rejects /api requests made without credentials
+        self._auth_required = False
+
+        # Cached GET responses as endpoint -> (expires at, data), see CACHE_TTL
+        self._cache: dict[str, tuple[float, Any]] = {}
+        # Bumped per endpoint by _invalidate_cache
+        self._cache_generation: dict[str, int] = {}
+        # GET endpoints that returned 404 as endpoint -> retry after
+        self._not_found: dict[str, float] = {}
+        # ETag and payload of the last GET response per endpoint, replayed
+        # when the server answers a conditional request with 304
+        self._etags: dict[str, tuple[str, Any]] = {}
+        # Parsed URLs of the (fixed) GET endpoints polled every update
+        self._urls: dict[str, URL] = {}
+
+        # In-flight GET requests per endpoint, shared by concurrent callers
+        self._inflight: dict[str, asyncio.Task[Any]] = {}
+        # Last successfully fetched value per get_all_data key, with its time
+        self._last_good: dict[str, tuple[float, Any]] = {}
+        # In-flight get_all_data fetch shared by concurrent callers
+        self._all_data_task: asyncio.Task[dict[str, Any]] | None = None
+        # When the last get_all_data fetch finished (time.monotonic())
+        self._all_data_at = 0.0
+        # Completed writes, and their count when the get_all_data fetch started
+        self._writes = 0
+        self._all_data_writes = 0
+
+        # Pending file UID batches per endpoint (see _post_file_batch)
+        self._file_batches: dict[str, tuple[set[str], asyncio.Task[bool]]] = {}
 
         protocol = "https" if ssl else "http"
         self._base_url = f"{protocol}://{host}:{port}"
@@ -104,8 +233,16 @@ class FileFlowsApi:
     async def _get_session(self) -> aiohttp.ClientSession:
         """Get or create aiohttp session."""
         if self._session is None:
-            connector = aiohttp.TCPConnector(ssl=self._verify_ssl if self._ssl else None)
-            self._session = aiohttp.ClientSession(connector=connector)
+            # Keep connections open across coordinator polls (every 30s by
+            # default) so requests reuse them instead of reconnecting
+            connector = aiohttp.TCPConnector(
+                ssl=self._verify_ssl if self._ssl else None,
+                limit=32,
+                limit_per_host=16,
+                keepalive_timeout=75,
+                ttl_dns_cache=300,
+            )
+            self._session = aiohttp.ClientSession(connector=connector, timeout=DEFAULT_TIMEOUT)
             self._close_session = True
         return self._session
 
@@ -126,21 +263,35 @@ class FileFlowsApi:
             return None
 
         # Check if we have a valid cached token
-        if self._bearer_token and self._token_expires_at:
-            if datetime.now() < self._token_expires_at:
-                _LOGGER.debug("Using cached Bearer token")
+        if self._bearer_token and time.monotonic() < self._token_expires_at:
+            return self._bearer_token
+
+        # Concurrent callers wait for a single login instead of each logging in
+        last_error = self._login_error
+        async with self._token_lock:
+            if self._bearer_token and time.monotonic() < self._token_expires_at:
                 return self._bearer_token
+            # A login that failed while we waited fails us too, instead of
+            # each waiter trying (and possibly timing out) again in turn
+            if (error := self._login_error) is not last_error and error is not None:
+                raise type(error)(*error.args) from error
+            try:
+                return await self._login()
+            except FileFlowsApiError as err:
+                self._login_error = err
+                raise
 
-        # Need to login and get new token
+    async def _login(self) -> str:
+        """Login and cache a new Bearer token."""
         _LOGGER.debug("Acquiring new Bearer token for user: %s", self._username)
 
         session = await self._get_session()
-        url = f"{self._base_url}/authorize"
+        url = f"{self._base_url}{AUTHORIZE}"
 
         try:
             async with session.post(
                 url,
-                json={"username": self._username, "password": self._password},
+                data=_json_dumps({"username": self._username, "password": self._password}),
                 headers={"Content-Type": "application/json"},
                 timeout=DEFAULT_TIMEOUT,
             ) as response:
@@ -156,9 +307,15 @@ class FileFlowsApi:
                 if not token:
                     raise FileFlowsAuthError("Login succeeded but no token received")
 
-                # Cache the token
+                # Cache the token and the headers that carry it
                 self._bearer_token = token
-                self._token_expires_at = datetime.now() + TOKEN_CACHE_DURATION
+                # Shorten the lifetime by up to 10% so clients that logged in
+                # together don't all log in again at the same moment
+                self._token_expires_at = time.monotonic() + _token_lifetime(token) * random.uniform(0.9, 1.0)
+                self._auth_headers = {
+                    **self._BASE_HEADERS,
+                    "Authorization": f"Bearer {token}",
+                }
 
                 _LOGGER.info("Bearer token acquired successfully")
                 return token
@@ -170,23 +327,24 @@ class FileFlowsApi:
             _LOGGER.error("Connection error during login: %s", err)
             raise FileFlowsConnectionError(f"Login connection failed: {err}") from err
 
-    def _get_headers(self, use_auth: bool = True, bearer_token: str | None = None) -> dict[str, str]:
+    def _get_headers(self, use_auth: bool = True, has_body: bool = False) -> dict[str, str]:
         """Get request headers.
 
+        Without a body this returns one of the cached header dicts - callers
+        must not mutate it.
+
         Args:
             use_auth: Whether to include authentication
-            bearer_token: Bearer token to use (if available)
+            has_body: Whether the request sends a JSON body
 
         Returns:
             Headers dictionary
         """
-        headers = {
-            "Content-Type": "application/json",
-            "Accept": "application/json",
-        }
-        # Add Bearer token if provided
-        if use_auth and bearer_token:
-            headers["Authorization"] = f"Bearer {bearer_token}"
+        headers = self._BASE_HEADERS
+        if use_auth and self._auth_headers is not None:
+            headers = self._auth_headers
+        if has_body:
+            return {**headers, "Content-Type": "application/json"}
         return headers
 
     async def _request(
@@ -209,64 +367,165 @@ class FileFlowsApi:
         Returns:
             Response data (dict, list, or string)
         """
+        if method != "GET" or params is not None:
+            try:
+                return await self._send_request(method, endpoint, data, params, use_auth)
+            finally:
+                # Refreshes and GETs started before this point may miss the
+                # change - don't let later callers join them
+                self._writes += 1
+                self._invalidate_cache(*self._inflight)
+
+        # Don't retry endpoints this server doesn't have (e.g. no GPU)
+        if self._not_found.get(endpoint, 0) > time.monotonic():
+            raise FileFlowsApiError(f"Endpoint not available: {endpoint}")
+
+        ttl = CACHE_TTL.get(endpoint)
+        if ttl is not None:
+            cached = self._cache.get(endpoint)
+            if cached is not None and time.monotonic() < cached[0]:
+                return cached[1]
+
+        # Concurrent GETs of the same endpoint share a single request
+        generation = self._cache_generation.get(endpoint, 0)
+        task = self._inflight.get(endpoint)
+        if task is None:
+            task = asyncio.create_task(
+                self._send_request(method, endpoint, data, params, use_auth)
+            )
+            self._inflight[endpoint] = task
+            task.add_done_callback(partial(self._inflight_done, endpoint))
+        result = await asyncio.shield(task)
+
+        # Don't cache a response that may predate an invalidation
+        if ttl is not None and self._cache_generation.get(endpoint, 0) == generation:
+            self._cache[endpoint] = (time.monotonic() + ttl, result)
+        return result
+
+    def _inflight_done(self, endpoint: str, task: asyncio.Task[Any]) -> None:
+        """Forget a finished in-flight request, unless it was already replaced."""
+        if self._inflight.get(endpoint) is task:
+            del self._inflight[endpoint]
+
+    def _invalidate_cache(self, *endpoints: str) -> None:
+        """Drop cached responses so the next GET hits the server.
+
+        Requests already in flight for these endpoints are neither cached nor
+        shared with later callers, as their data may predate the change.
+        """
+        for endpoint in endpoints:
+            self._cache.pop(endpoint, None)
+            self._inflight.pop(endpoint, None)
+            self._cache_generation[endpoint] = self._cache_generation.get(endpoint, 0) + 1
+
+    def reset_negative_cache(self) -> None:
+        """Forget endpoints that returned 404 so they are tried again."""
+        self._not_found.clear()
+
+    def clear_cache(self) -> None:
+        """Drop all cached responses so the next refresh fetches everything."""
+        self._invalidate_cache(*self._cache, *self._inflight)
+        self.reset_negative_cache()
+        self._all_data_task = None
+        self._all_data_at = 0.0
+
+    async def _send_request(
+        self,
+        method: str,
+        endpoint: str,
+        data: dict[str, Any] | list | None,
+        params: dict[str, Any] | None,
+        use_auth: bool,
+    ) -> Any:
+        """Send a request, retrying once with a fresh token on 401.
+
+        Requests throttled with 429, and GETs failing with 502/503/504, are
+        sent up to REQUEST_ATTEMPTS times with backoff in between.
+        """
         session = await self._get_session()
-        url = f"{self._base_url}{endpoint}"
+        url = self._urls.get(endpoint)
+        if url is None:
+            url = URL(f"{self._base_url}{endpoint}")
+            if method == "GET":
+                self._urls[endpoint] = url
 
         # Get Bearer token if authentication is requested and credentials are available
         bearer_token = None
         if use_auth:
             bearer_token = await self._get_bearer_token()
-            if bearer_token:
-                _LOGGER.debug("Using Bearer auth for: %s", endpoint)
 
-        headers = self._get_headers(use_auth, bearer_token)
-
-        _LOGGER.debug("Requesting %s %s", method, url)
+        body = None if data is None else _json_dumps(data)
+        conditional = method == "GET" and params is None
+        headers = self._request_headers(endpoint, use_auth, body is not None, conditional)
 
+        # Backoff retries made so far; the one-off 401 retry doesn't count
+        attempt = 0
+        auth_retried = False
         try:
-            async with session.request(
-                method,
-                url,
-                json=data,
-                params=params,
-                headers=headers,
-                timeout=DEFAULT_TIMEOUT,
-            ) as response:
-                _LOGGER.debug("Response status: %s", response.status)
-
-                if response.status == 401:
-                    # Token might be expired, try to refresh once
-                    if bearer_token and endpoint.startswith("/api"):
-                        _LOGGER.warning("401 error, token might be expired. Clearing cache and retrying once...")
-                        self._bearer_token = None
-                        self._token_expires_at = None
-
-                        # Retry once with fresh token
-                        bearer_token = await self._get_bearer_token()
-                        if bearer_token:
-                            headers = self._get_headers(use_auth, bearer_token)
-                            async with session.request(
-                                method, url, json=data, params=params, headers=headers, timeout=DEFAULT_TIMEOUT
-                            ) as retry_response:
-                                if retry_response.status == 401:
-                                    raise FileFlowsAuthError("Authentication failed - check credentials")
-                                retry_response.raise_for_status()
-                                return await self._parse_response(retry_response)
-                        else:
-                            raise FileFlowsAuthError("Authentication required but no credentials configured")
-                    else:
+            while True:
+                async with session.request(
+                    method,
+                    url,
+                    data=body,
+                    params=params,
+                    headers=headers,
+                    timeout=DEFAULT_TIMEOUT,
+                ) as response:
+                    _LOGGER.debug("%s %s -> %s", method, url, response.status)
+                    status = response.status
+
+                    # Success (including 304) - the common case, checked first
+                    if status < 400:
+                        if conditional:
+                            return await self._parse_conditional(endpoint, response)
+                        return await self._parse_response(response)
+
+                    if attempt < REQUEST_ATTEMPTS - 1 and (
+                        status == 429 or (method == "GET" and status in RETRY_STATUSES)
+                    ):
+                        # Server is busy or restarting - back off and try again
+                        delay = self._retry_delay(response, attempt)
+                        _LOGGER.debug("Retrying %s in %.1fs (HTTP %s)", endpoint, delay, status)
+                    elif status == 403:
+                        raise FileFlowsAuthError("Access forbidden")
+                    elif status != 401:
+                        if status == 404 and method == "GET":
+                            self._not_found[endpoint] = time.monotonic() + NOT_FOUND_CACHE_DURATION
+                        _LOGGER.error("API response error for %s: %s, %s", endpoint, status, response.reason)
+                        raise FileFlowsApiError(f"API error: {status}")
+                    elif auth_retried:
+                        raise FileFlowsAuthError("Authentication failed - check credentials")
+                    elif not (bearer_token and endpoint.startswith("/api")):
+                        if (
+                            not self._auth_required
+                            and endpoint.startswith("/api")
+                            and not (self._username and self._password)
+                        ):
+                            self._auth_required = True
+                            _LOGGER.info(
+                                "FileFlows requires authentication, skipping authenticated "
+                                "endpoints until username and password are configured"
+                            )
                         raise FileFlowsAuthError("Authentication failed")
+                    else:
+                        # Token might be expired, clear it (unless a concurrent
+                        # request already replaced it) and retry once
+                        _LOGGER.warning("401 error, token might be expired. Clearing cache and retrying once...")
+                        if self._bearer_token == bearer_token:
+                            self._bearer_token = None
+                            self._token_expires_at = 0.0
+                            self._auth_headers = None
+                        delay = None
+
+                # Wait or log in again after the response has been released
+                if delay is not None:
+                    await asyncio.sleep(delay)
+                    attempt += 1
+                else:
+                    auth_retried = True
+                    bearer_token = await self._get_bearer_token()
+                    headers = self._request_headers(endpoint, use_auth, body is not None, conditional)
 
-                if response.status == 403:
-                    raise FileFlowsAuthError("Access forbidden")
-
-                response.raise_for_status()
-
-                return await self._parse_response(response)
-
-        except ClientResponseError as err:
-            _LOGGER.error("API response error for %s: %s", endpoint, err)
-            raise FileFlowsApiError(f"API error: {err.status}") from err
         except ClientError as err:
             _LOGGER.error("Connection error for %s: %s", endpoint, err)
             raise FileFlowsConnectionError(f"Connection failed: {err}") from err
@@ -274,6 +533,36 @@ class FileFlowsApi:
             _LOGGER.error("Request timeout for %s", endpoint)
             raise FileFlowsConnectionError("Request timeout") from err
 
+    def _request_headers(
+        self, endpoint: str, use_auth: bool, has_body: bool, conditional: bool
+    ) -> dict[str, str]:
+        """Get headers for a request, made conditional if an ETag is known."""
+        headers = self._get_headers(use_auth, has_body)
+        # Let the server skip the body if it hasn't changed since last time
+        if conditional and (cached := self._etags.get(endpoint)) is not None:
+            return {**headers, "If-None-Match": cached[0]}
+        return headers
+
+    @staticmethod
+    def _retry_delay(response: aiohttp.ClientResponse, attempt: int) -> float:
+        """Seconds to wait before retrying, preferring the server's Retry-After."""
+        retry_after = response.headers.get("Retry-After", "")
+        if retry_after.isdigit():
+            return min(int(retry_after), MAX_RETRY_DELAY)
+        return 0.5 * 2**attempt + random.uniform(0, 0.25)
+
+    async def _parse_conditional(self, endpoint: str, response: aiohttp.ClientResponse) -> Any:
+        """Parse a GET response, remembering its ETag for the next request."""
+        if response.status == 304:
+            if (cached := self._etags.get(endpoint)) is None:
+                raise FileFlowsApiError(f"Not modified, but no cached data for {endpoint}")
+            return cached[1]
+
+        result = await self._parse_response(response)
+        if (etag := response.headers.get("ETag")) is not None:
+            self._etags[endpoint] = (etag, result)
+        return result
+
     async def _parse_response(self, response: aiohttp.ClientResponse) -> Any:
         """Parse API response.
 
@@ -287,45 +576,40 @@ class FileFlowsApi:
         if response.status == 204:
             return None
 
-        content_type = response.headers.get("Content-Type", "")
-        text = await response.text()
-
-        if not text:
+        raw = await response.read()
+        if not raw:
             return None
 
-        if "application/json" in content_type:
-            return await response.json()
+        # Plain text bodies that can't be JSON (e.g. a bare version string)
+        # are returned as is, without going through a failed JSON parse first
+        if response.content_type == "text/plain" and raw.lstrip()[:1] not in _JSON_START:
+            return raw.decode(errors="replace")
 
-        # Try to parse as JSON anyway
+        # Parse straight from bytes; anything else that isn't JSON is
+        # returned as text
         try:
-            import json
-            return json.loads(text)
-        except:
-            return text
+            return _json_loads(raw)
+        except ValueError:
+            return raw.decode(errors="replace")
 
-    async def _get(
-        self, endpoint: str, params: dict[str, Any] | None = None, use_auth: bool = True
-    ) -> Any:
-        """Make a GET request."""
-        return await self._request("GET", endpoint, params=params, use_auth=use_auth)
+    # Verb shortcuts, e.g. self._post(endpoint, data)
+    _get = partialmethod(_request, "GET")
+    _post = partialmethod(_request, "POST")
+    _put = partialmethod(_request, "PUT")
+    _delete = partialmethod(_request, "DELETE")
 
-    async def _post(
-        self, endpoint: str, data: dict[str, Any] | list | None = None, use_auth: bool = True
-    ) -> Any:
-        """Make a POST request."""
-        return await self._request("POST", endpoint, data=data, use_auth=use_auth)
-
-    async def _put(
-        self, endpoint: str, data: dict[str, Any] | list | None = None, use_auth: bool = True
-    ) -> Any:
-        """Make a PUT request."""
-        return await self._request("PUT", endpoint, data=data, use_auth=use_auth)
+    async def _get_or_default(self, endpoint: str, result_type: type[dict] | type[list]) -> Any:
+        """Make a GET request, returning an empty result_type on failure.
 
-    async def _delete(
-        self, endpoint: str, data: dict[str, Any] | list | None = None, use_auth: bool = True
-    ) -> Any:
-        """Make a DELETE request."""
-        return await self._request("DELETE", endpoint, data=data, use_auth=use_auth)
+        Errors and payloads of an unexpected type are logged at debug level
+        and yield an empty dict/list, so callers always get usable data.
+        """
+        try:
+            result = await self._get(endpoint)
+        except FileFlowsApiError as err:
+            _LOGGER.debug("Could not get %s: %s", endpoint, err)
+            return result_type()
+        return result if isinstance(result, result_type) else result_type()
 
     # =========================================================================
     # Connection Test - Uses PUBLIC endpoint (no auth)
@@ -336,32 +620,22 @@ class FileFlowsApi:
         If credentials are configured, uses /api/status (requires auth).
         Otherwise tries /remote/info/status (public).
         """
+        has_auth = bool(self._username and self._password)
         try:
-            # If we have credentials, use authenticated /api/status endpoint
-            if self._username and self._password:
-                _LOGGER.debug("Testing connection with /api/status (authenticated)")
-                result = await self._get(API_STATUS, use_auth=True)
-            else:
-                _LOGGER.debug("Testing connection with /remote/info/status (no auth)")
-                result = await self._get(REMOTE_STATUS, use_auth=False)
-
-            # Validate result
-            if not isinstance(result, dict):
-                _LOGGER.warning("Connection test returned non-dict: %s", type(result))
-                return False
-
-            # Check if we got valid data (queue should be present)
-            if "queue" in result:
-                _LOGGER.debug("Connection test successful, queue=%s", result.get("queue"))
-                return True
-
-            _LOGGER.warning("Connection test returned dict without 'queue' key")
-            return False
-
+            result = await self._get(
+                API_STATUS if has_auth else REMOTE_STATUS, use_auth=has_auth
+            )
         except FileFlowsApiError as err:
             _LOGGER.error("Connection test failed: %s", err)
             return False
 
+        # A valid status payload always contains the queue count
+        if isinstance(result, dict) and "queue" in result:
+            return True
+
+        _LOGGER.warning("Connection test returned unexpected data: %s", type(result))
+        return False
+
     # =========================================================================
     # Remote Endpoints - Use Bearer auth if credentials are available
     # =========================================================================
@@ -443,11 +717,7 @@ class FileFlowsApi:
 
     async def get_system_info(self) -> dict[str, Any]:
         """Gets system information (memory, CPU)."""
-        try:
-            return await self._get(API_SYSTEM_INFO)
-        except FileFlowsApiError as err:
-            _LOGGER.debug("Could not get system info: %s", err)
-            return {}
+        return await self._get_or_default(API_SYSTEM_INFO, dict)
 
     async def pause_system(self, minutes: int = 0) -> bool:
         """Pause the system. minutes=0 means indefinitely."""
@@ -471,6 +741,11 @@ class FileFlowsApi:
         """Restart FileFlows server."""
         try:
             await self._post(API_SYSTEM_RESTART)
+            # The server may come back updated, with a different set of endpoints
+            self.reset_negative_cache()
+            self._invalidate_cache(
+                API_SYSTEM_VERSION, REMOTE_VERSION, REMOTE_UPDATE_AVAILABLE, API_PLUGINS
+            )
             return True
         except FileFlowsApiError as err:
             _LOGGER.error("Failed to restart system: %s", err)
@@ -478,26 +753,18 @@ class FileFlowsApi:
 
     async def get_fileflows_status(self) -> dict[str, Any]:
         """Gets the system status of FileFlows."""
-        try:
-            return await self._get(API_SETTINGS_FILEFLOWS_STATUS)
-        except FileFlowsApiError as err:
-            _LOGGER.debug("Could not get fileflows status: %s", err)
-            return {}
+        return await self._get_or_default(API_SETTINGS_FILEFLOWS_STATUS, dict)
 
     # Node Endpoints
     async def get_nodes(self) -> list[dict[str, Any]]:
         """Gets all processing nodes."""
-        try:
-            result = await self._get(API_NODES)
-            return result if isinstance(result, list) else []
-        except FileFlowsApiError as err:
-            _LOGGER.debug("Could not get nodes: %s", err)
-            return []
+        return await self._get_or_default(API_NODES, list)
 
     async def set_node_state(self, uid: str, enabled: bool) -> bool:
         """Set state of a processing node."""
         try:
-            await self._put(f"{API_NODES}/state/{uid}?enable={str(enabled).lower()}")
+            await self._put(API_NODE_STATE.format(uid=uid), params=ENABLE_PARAMS[enabled])
+            self._invalidate_cache(API_NODES)
             return True
         except FileFlowsApiError as err:
             _LOGGER.error("Failed to set node state: %s", err)
@@ -514,17 +781,13 @@ class FileFlowsApi:
     # Library Endpoints
     async def get_libraries(self) -> list[dict[str, Any]]:
         """Gets all libraries."""
-        try:
-            result = await self._get(API_LIBRARIES)
-            return result if isinstance(result, list) else []
-        except FileFlowsApiError as err:
-            _LOGGER.debug("Could not get libraries: %s", err)
-            return []
+        return await self._get_or_default(API_LIBRARIES, list)
 
     async def set_library_state(self, uid: str, enabled: bool) -> bool:
         """Set the enable state for a library."""
         try:
-            await self._put(f"{API_LIBRARY_STATE}/{uid}?enable={str(enabled).lower()}")
+            await self._put(API_LIBRARY_STATE.format(uid=uid), params=ENABLE_PARAMS[enabled])
+            self._invalidate_cache(API_LIBRARIES)
             return True
         except FileFlowsApiError as err:
             _LOGGER.error("Failed to set library state: %s", err)
@@ -545,11 +808,16 @@ class FileFlowsApi:
                 await self._put(API_LIBRARY_RESCAN, uids)
             else:
                 await self._post(API_LIBRARY_RESCAN_ENABLED)
+            self._invalidate_cache(API_LIBRARIES)
             return True
         except FileFlowsApiError as err:
             _LOGGER.error("Failed to rescan libraries: %s", err)
             return False
 
+    async def rescan_library(self, uid: str) -> bool:
+        """Rescan a single library."""
+        return await self.rescan_libraries([uid])
+
     async def rescan_all_libraries(self) -> bool:
         """Rescan all enabled libraries."""
         return await self.rescan_libraries()
@@ -557,29 +825,15 @@ class FileFlowsApi:
     # Library File Endpoints
     async def get_library_file_status(self) -> dict[str, Any]:
         """Gets the library status overview."""
-        try:
-            return await self._get(API_LIBRARY_FILE_STATUS)
-        except FileFlowsApiError as err:
-            _LOGGER.debug("Could not get library file status: %s", err)
-            return {}
+        return await self._get_or_default(API_LIBRARY_FILE_STATUS, dict)
 
     async def get_upcoming_files(self) -> list[dict[str, Any]]:
         """Get next 10 upcoming files to process."""
-        try:
-            result = await self._get(API_LIBRARY_FILE_UPCOMING)
-            return result if isinstance(result, list) else []
-        except FileFlowsApiError as err:
-            _LOGGER.debug("Could not get upcoming files: %s", err)
-            return []
+        return await self._get_or_default(API_LIBRARY_FILE_UPCOMING, list)
 
     async def get_recently_finished(self) -> list[dict[str, Any]]:
         """Gets the last 10 successfully processed files."""
-        try:
-            result = await self._get(API_LIBRARY_FILE_RECENTLY_FINISHED)
-            return result if isinstance(result, list) else []
-        except FileFlowsApiError as err:
-            _LOGGER.debug("Could not get recently finished: %s", err)
-            return []
+        return await self._get_or_default(API_LIBRARY_FILE_RECENTLY_FINISHED, list)
 
     async def reprocess_files(self, uids: list[str]) -> bool:
         """Reprocess library files."""
@@ -597,26 +851,53 @@ class FileFlowsApi:
     async def unhold_files(self, uids: list[str]) -> bool:
         """Unhold library files."""
         try:
-            await self._post(API_LIBRARY_FILE_UNHOLD, uids)
-            return True
+            return await self._post_file_batch(API_LIBRARY_FILE_UNHOLD, uids)
         except FileFlowsApiError as err:
             _LOGGER.error("Failed to unhold files: %s", err)
             return False
 
+    async def force_processing(self, uids: list[str]) -> bool:
+        """Force processing of library files that are out of schedule.
+
+        Raises FileFlowsApiError on failure, so the service call fails too.
+        """
+        return await self._post_file_batch(API_LIBRARY_FILE_FORCE_PROCESSING, uids)
+
+    async def _post_file_batch(self, endpoint: str, uids: list[str]) -> bool:
+        """POST file UIDs, merging calls made within FILE_BATCH_DELAY.
+
+        Callers hitting the same endpoint while a batch is pending add their
+        UIDs to it and share the result of the single request.
+        """
+        if (batch := self._file_batches.get(endpoint)) is not None:
+            pending, flush = batch
+            pending.update(uids)
+        else:
+            pending = set(uids)
+            flush = asyncio.create_task(self._flush_file_batch(endpoint, pending))
+            self._file_batches[endpoint] = (pending, flush)
+        return await asyncio.shield(flush)
+
+    async def _flush_file_batch(self, endpoint: str, pending: set[str]) -> bool:
+        """Send the file UIDs collected for an endpoint."""
+        try:
+            await asyncio.sleep(FILE_BATCH_DELAY)
+        finally:
+            # Later callers start a new batch, even if this one was cancelled
+            del self._file_batches[endpoint]
+        await self._post(endpoint, list(pending))
+        return True
+
     # Flow Endpoints
     async def get_flows(self) -> list[dict[str, Any]]:
         """Get all flows."""
-        try:
-            result = await self._get(API_FLOWS)
-            return result if isinstance(result, list) else []
-        except FileFlowsApiError as err:
-            _LOGGER.debug("Could not get flows: %s", err)
-            return []
+        return await self._get_or_default(API_FLOWS, list)
 
     async def set_flow_state(self, uid: str, enabled: bool) -> bool:
         """Sets the enabled state of a flow."""
         try:
-            await self._put(f"{API_FLOWS}/state/{uid}?enable={str(enabled).lower()}")
+            await self._put(API_FLOW_STATE.format(uid=uid), params=ENABLE_PARAMS[enabled])
+            self._invalidate_cache(API_FLOWS)
             return True
         except FileFlowsApiError as err:
             _LOGGER.error("Failed to set flow state: %s", err)
@@ -633,17 +914,12 @@ class FileFlowsApi:
     # Worker Endpoints
     async def get_workers(self) -> list[dict[str, Any]]:
         """Get all running flow executors."""
-        try:
-            result = await self._get(API_WORKERS)
-            return result if isinstance(result, list) else []
-        except FileFlowsApiError as err:
-            _LOGGER.debug("Could not get workers: %s", err)
-            return []
+        return await self._get_or_default(API_WORKERS, list)
 
     async def abort_worker(self, uid: str) -> bool:
         """Abort work."""
         try:
-            await self._delete(f"{API_WORKERS}/{uid}")
+            await self._delete(API_WORKER.format(uid=uid))
             return True
         except FileFlowsApiError as err:
             _LOGGER.error("Failed to abort worker: %s", err)
@@ -652,7 +928,7 @@ class FileFlowsApi:
     async def abort_worker_by_file(self, file_uid: str) -> bool:
         """Abort work by library file."""
         try:
-            await self._delete(f"{API_WORKERS}/by-file/{file_uid}")
+            await self._delete(API_WORKER_BY_FILE.format(uid=file_uid))
             return True
         except FileFlowsApiError as err:
             _LOGGER.error("Failed to abort worker by file: %s", err)
@@ -661,17 +937,13 @@ class FileFlowsApi:
     # Task Endpoints
     async def get_tasks(self) -> list[dict[str, Any]]:
         """Get all scheduled tasks."""
-        try:
-            result = await self._get(API_TASKS)
-            return result if isinstance(result, list) else []
-        except FileFlowsApiError as err:
-            _LOGGER.debug("Could not get tasks: %s", err)
-            return []
+        return await self._get_or_default(API_TASKS, list)
 
     async def run_task(self, uid: str) -> bool:
         """Runs a scheduled task now."""
         try:
-            await self._post(f"{API_TASKS}/run/{uid}")
+            await self._post(API_TASK_RUN.format(uid=uid))
+            self._invalidate_cache(API_TASKS)
             return True
         except FileFlowsApiError as err:
             _LOGGER.error("Failed to run task: %s", err)
@@ -680,21 +952,12 @@ class FileFlowsApi:
     # Plugin Endpoints
     async def get_plugins(self) -> list[dict[str, Any]]:
         """Get list of all plugins."""
-        try:
-            result = await self._get(API_PLUGINS)
-            return result if isinstance(result, list) else []
-        except FileFlowsApiError as err:
-            _LOGGER.debug("Could not get plugins: %s", err)
-            return []
+        return await self._get_or_default(API_PLUGINS, list)
 
     # NVIDIA Endpoints
     async def get_nvidia_smi(self) -> dict[str, Any]:
         """Gets the NVIDIA SMI data."""
-        try:
-            result = await self._get(API_NVIDIA_SMI)
-            return result if isinstance(result, dict) else {}
-        except FileFlowsApiError:
-            return {}
+        return await self._get_or_default(API_NVIDIA_SMI, dict)
 
     # Statistics Endpoints
     async def get_storage_saved(self) -> dict[str, Any]:
@@ -702,18 +965,44 @@ class FileFlowsApi:
 
         Returns aggregated storage savings data.
         """
-        try:
-            result = await self._get(API_STATISTICS_STORAGE_SAVED)
-            return result if isinstance(result, dict) else {}
-        except FileFlowsApiError as err:
-            _LOGGER.debug("Could not get storage saved: %s", err)
-            return {}
+        return await self._get_or_default(API_STATISTICS_STORAGE_SAVED, dict)
 
     # =========================================================================
     # Combined Data Fetch for Coordinator
     # =========================================================================
     async def get_all_data(self) -> dict[str, Any]:
         """Get all data needed for sensors.
+
+        Callers arriving while a fetch is in flight, or within
+        MIN_REFRESH_INTERVAL of the last one, share its result instead of
+        starting another round of requests. A fetch that started before the
+        latest write is never shared, so changes show up on the next refresh.
+        """
+        task = self._all_data_task
+        if task is not None and self._all_data_writes != self._writes:
+            task = None
+        elif task is not None and task.done():
+            # Don't poll the whole API again right after a full refresh
+            if (
+                time.monotonic() - self._all_data_at < MIN_REFRESH_INTERVAL
+                and not task.cancelled()
+                and task.exception() is None
+            ):
+                return task.result()
+            task = None
+        if task is None:
+            self._all_data_writes = self._writes
+            task = self._all_data_task = asyncio.create_task(self._fetch_all_data())
+            task.add_done_callback(self._all_data_done)
+        return await asyncio.shield(task)
+
+    def _all_data_done(self, task: asyncio.Task[dict[str, Any]]) -> None:
+        """Start the reuse window when the current get_all_data fetch ends."""
+        if task is self._all_data_task:
+            self._all_data_at = time.monotonic()
+
+    async def _fetch_all_data(self) -> dict[str, Any]:
+        """Fetch all data needed for sensors.
         
         Uses PUBLIC endpoints for basic data (no auth required),
         and AUTHENTICATED endpoints for extended data.
@@ -740,127 +1029,82 @@ class FileFlowsApi:
             "storage_saved_stats": {},  # From /api/statistics/storage-saved
         }
 
-        # =================================================================
-        # STATUS ENDPOINT - Use /api/status if auth available, else /remote/info/status
-        # =================================================================
+        has_auth = bool(self._username and self._password)
 
-        # Status - primary source for queue/processing info
-        try:
-            # Use /api/status if we have credentials (more reliable)
-            if self._username and self._password:
-                _LOGGER.debug("Fetching status from /api/status (authenticated)")
-                data["remote_status"] = await self._get(API_STATUS, use_auth=True)
-            else:
-                _LOGGER.debug("Fetching status from /remote/info/status (public)")
-                data["remote_status"] = await self.get_remote_status()
-            _LOGGER.debug("Status data: %s", data["remote_status"])
-        except FileFlowsApiError as err:
-            _LOGGER.warning("Could not get status: %s", err)
-
-        # Storage savings - use /api/statistics/storage-saved if auth available
-        try:
-            if self._username and self._password:
-                _LOGGER.debug("Fetching storage savings from /api/statistics/storage-saved")
-                data["storage_saved_stats"] = await self.get_storage_saved()
-                # Don't fetch shrinkage_groups if we have the new endpoint data
-                # Fallback is handled in coordinator properties
-            else:
-                # No auth - try public remote endpoint
-                _LOGGER.debug("Fetching shrinkage from /remote/info/shrinkage-groups (no auth)")
-                try:
-                    data["shrinkage_groups"] = await self.get_remote_shrinkage()
-                except FileFlowsApiError:
-                    pass  # Remote endpoints may not be available
-        except FileFlowsApiError as err:
-            _LOGGER.debug("Could not get storage data: %s", err)
-
-        # Update available - only try if no auth (remote endpoint may not exist with auth)
-        if not (self._username and self._password):
+        if has_auth:
+            # Acquire the token up front so the concurrent requests share it
+            # instead of each logging in
             try:
-                data["update_available"] = await self.get_remote_update_available()
+                await self._get_bearer_token()
             except FileFlowsApiError as err:
-                _LOGGER.debug("Could not get update info: %s", err)
-
-        # Version
-        try:
-            data["version"] = await self.get_version()
-        except FileFlowsApiError as err:
-            _LOGGER.debug("Could not get version: %s", err)
-
-        # =================================================================
-        # AUTHENTICATED ENDPOINTS (require token if auth is enabled)
-        # =================================================================
-
-        # System info (CPU, Memory)
-        try:
-            data["system_info"] = await self.get_system_info()
-        except FileFlowsApiError as err:
-            _LOGGER.debug("Could not get system info (auth required?): %s", err)
-
-        # FileFlows status
-        try:
-            data["fileflows_status"] = await self.get_fileflows_status()
-        except FileFlowsApiError as err:
-            _LOGGER.debug("Could not get fileflows status: %s", err)
-
-        # Nodes
-        try:
-            data["nodes"] = await self.get_nodes()
-        except FileFlowsApiError as err:
-            _LOGGER.debug("Could not get nodes: %s", err)
-
-        # Libraries
-        try:
-            data["libraries"] = await self.get_libraries()
-        except FileFlowsApiError as err:
-            _LOGGER.debug("Could not get libraries: %s", err)
-
-        # Flows
-        try:
-            data["flows"] = await self.get_flows()
-        except FileFlowsApiError as err:
-            _LOGGER.debug("Could not get flows: %s", err)
-
-        # Workers
-        try:
-            data["workers"] = await self.get_workers()
-        except FileFlowsApiError as err:
-            _LOGGER.debug("Could not get workers: %s", err)
-
-        # Tasks
-        try:
-            data["tasks"] = await self.get_tasks()
-        except FileFlowsApiError as err:
-            _LOGGER.debug("Could not get tasks: %s", err)
-
-        # Plugins
-        try:
-            data["plugins"] = await self.get_plugins()
-        except FileFlowsApiError as err:
-            _LOGGER.debug("Could not get plugins: %s", err)
-
-        # Library file status
-        try:
-            data["library_file_status"] = await self.get_library_file_status()
-        except FileFlowsApiError as err:
-            _LOGGER.debug("Could not get library file status: %s", err)
-
-        # Upcoming files
-        try:
-            data["upcoming_files"] = await self.get_upcoming_files()
-        except FileFlowsApiError as err:
-            _LOGGER.debug("Could not get upcoming files: %s", err)
-
-        # Recently finished
-        try:
-            data["recently_finished"] = await self.get_recently_finished()
-        except FileFlowsApiError as err:
-            _LOGGER.debug("Could not get recently finished: %s", err)
-
-        # NVIDIA SMI (optional)
-        try:
-            data["nvidia"] = await self.get_nvidia_smi()
-        except FileFlowsApiError as err:
-            _LOGGER.debug("Could not get nvidia info: %s", err)
+                _LOGGER.debug("Could not acquire Bearer token: %s", err)
+
+        # Endpoints are independent - fetch them concurrently
+        jobs: dict[str, Awaitable[Any]] = {}
+        if has_auth:
+            # Status and storage savings from authenticated endpoints; remote
+            # endpoints are skipped as they log "Unauthorized" on the server
+            jobs["remote_status"] = self._get(API_STATUS, use_auth=True)
+            jobs["storage_saved_stats"] = self._get(API_STATISTICS_STORAGE_SAVED)
+        else:
+            # No auth - fall back to the public remote endpoints
+            jobs["remote_status"] = self._get(REMOTE_STATUS, use_auth=False)
+            jobs["shrinkage_groups"] = self._get(REMOTE_SHRINKAGE, use_auth=False)
+            jobs["update_available"] = self.get_remote_update_available()
+
+        jobs["version"] = self.get_version()
+
+        # Without credentials, skip the endpoints that need them once the
+        # server has shown it requires auth - they would only return 401
+        if has_auth or not self._auth_required:
+            jobs["system_info"] = self._get(API_SYSTEM_INFO)
+            jobs["fileflows_status"] = self._get(API_SETTINGS_FILEFLOWS_STATUS)
+            jobs["nodes"] = self._get(API_NODES)
+            jobs["libraries"] = self._get(API_LIBRARIES)
+            jobs["flows"] = self._get(API_FLOWS)
+            jobs["workers"] = self._get(API_WORKERS)
+            jobs["tasks"] = self._get(API_TASKS)
+            jobs["plugins"] = self._get(API_PLUGINS)
+            jobs["library_file_status"] = self._get(API_LIBRARY_FILE_STATUS)
+            jobs["upcoming_files"] = self._get(API_LIBRARY_FILE_UPCOMING)
+            jobs["recently_finished"] = self._get(API_LIBRARY_FILE_RECENTLY_FINISHED)
+            jobs["nvidia"] = self._get(API_NVIDIA_SMI)
+
+        results = dict(
+            zip(jobs, await asyncio.gather(*jobs.values(), return_exceptions=True))
+        )
+        # Without an answer to the status request the server is down - fail
+        # the refresh instead of reporting every sensor at its default
+        if isinstance(status := results["remote_status"], FileFlowsConnectionError):
+            raise status
+
+        now = time.monotonic()
+        for key, result in results.items():
+            if isinstance(result, FileFlowsApiError):
+                if key == "remote_status":
+                    _LOGGER.warning("Could not get status: %s", result)
+                else:
+                    _LOGGER.debug("Could not get %s: %s", key, result)
+                # The server is reachable, so a connection error on a single
+                # endpoint is transient - keep its recent data over the default
+                if isinstance(result, FileFlowsConnectionError):
+                    data[key] = self._recent_good(key, now, data[key])
+            elif isinstance(result, BaseException):
+                raise result
+            elif key == "version" and result == "Unknown":
+                # get_version hides its errors - keep a recently known version
+                data[key] = self._recent_good(key, now, result)
+            elif isinstance(result, type(data[key])):
+                data[key] = result
+                self._last_good[key] = (now, result)
+            else:
+                # Unexpected payload - keep the default
+                _LOGGER.debug("Unexpected %s data: %s", key, type(result))
 
         return data
+
+    def _recent_good(self, key: str, now: float, default: Any) -> Any:
+        """Return the last good value for key unless it is too old."""
+        if (last := self._last_good.get(key)) is not None and now - last[0] < LAST_GOOD_MAX_AGE:
+            return last[1]
+        return default
@@ -210,6 +210,7 @@ class FileFlowsRefreshButton(
 
     async def async_press(self) -> None:
         """Handle the button press."""
+        self.coordinator.api.clear_cache()
         await self.coordinator.async_request_refresh()
 
 
@@ -291,3 +291,4 @@ ATTR_FILE_UID: Final = "file_uid"
 ATTR_WORKER_UID: Final = "worker_uid"
 ATTR_TASK_UID: Final = "task_uid"
 ATTR_ENABLED: Final = "enabled"
+ATTR_SKIP_REFRESH: Final = "skip_refresh"